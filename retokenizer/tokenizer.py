@@ -1,61 +1,155 @@
+import re
+import warnings
+from array import array
+from bisect import bisect_right
 from collections.abc import Generator
-from typing import List, Iterable, Dict, Union, TextIO, Optional
+from types import ModuleType
+from typing import List, Iterable, Dict, Union, TextIO, Optional, Callable, Tuple, Sequence, Set, Iterator
 
 from .tokenprocessors import TokenProcessor
-from .tokens import Token, EndOfFileToken
+from .tokens import Token, EOF
 from .tokenizerexceptions import TokenizerError
 
 
+_reNewLine = re.compile(r"\n")
+_reGroupReference = re.compile(r"\[\^?\]?(?:\\.|[^\\\]])*\]|\\(?:([0-7]{3}|0[0-7]{0,2})|([1-9][0-9]?)|.)|(\(\?\()",
+                               re.DOTALL)
+
+
+def _shiftGroupReferences(pattern: str, shift: int) -> str:
+    """
+    Renumber numeric group references in a regular expression, escapes inside character sets are kept.
+
+    :param pattern: regular expression.
+    :param shift: number to add to every group reference.
+    :return: regular expression with shifted group references.
+    :raises ValueError: if the pattern contains a conditional group or a reference would be shifted above 99.
+    """
+    def shiftReference(match: re.Match):
+        if match[3] is not None:
+            raise ValueError("conditional groups can't be renumbered")
+
+        if match[2] is None:
+            return match[0]
+
+        reference = int(match[2]) + shift
+
+        if reference > 99:
+            raise ValueError("group references above 99 are read as octal escapes")
+
+        return f"\\{reference}"
+
+    return _reGroupReference.sub(shiftReference, pattern)
+
+
+def _isCombinable(tokenProcessor: TokenProcessor) -> bool:
+    """
+    Check whether a TokenProcessor can be matched with the combined regex.
+
+    :param tokenProcessor: TokenProcessor to check.
+    :return: True if the TokenProcessor has a buildPattern and its process is not overridden below its build.
+    """
+    if not isinstance(tokenProcessor.buildPattern, str):
+        return False
+
+    mro = type(tokenProcessor).__mro__
+    buildClass = next(cls for cls in mro if "build" in vars(cls))
+    processClass = next(cls for cls in mro if "process" in vars(cls))
+
+    return buildClass is not TokenProcessor and mro.index(processClass) >= mro.index(buildClass)
+
+
+def _splitLines(source: str) -> Tuple[List[str], array]:
+    """
+    Split a text into lines.
+
+    :param source: text to split.
+    :return: list of the lines and sorted offsets at which the lines start.
+    """
+    lineStarts = array("q", (0,))
+    lineStarts.extend(match.end() for match in _reNewLine.finditer(source))
+
+    return source.split("\n"), lineStarts
+
+
+def _scanCombined(source: str, combinedRegex: re.Pattern,
+                  builders: Dict[str, Tuple[Callable, int]]) -> Iterator[Tuple[Token, int]]:
+    """
+    Tokenize text content with a combined regex.
+
+    :param source: text content to process.
+    :param combinedRegex: combined regex of the TokenProcessors.
+    :param builders: build methods of the TokenProcessors and their group indexes, keyed by the group names.
+    :return: generator of the created Tokens and their offsets, returns the offset at which the tokenization stopped.
+    """
+    pos = 0
+
+    for m in combinedRegex.finditer(source):
+        if m.start() != pos:
+            break
+
+        build, group = builders[m.lastgroup]
+        res = build(m, group)
+
+        if res is not None:
+            for token, consumed in res:
+                if token is not None:
+                    yield token, pos
+
+                pos += consumed
+
+        pos = m.end()
+
+    return pos
+
+
 class TokenMappingView:
     """Contains data about Token's position in the processed file."""
-    __slots__ = ("__source", "__offset", "__lineNumber", "__line", "__lineOffset")
+    __slots__ = ("__offset", "__lines", "__lineStarts", "__lineIndex")
 
-    __source: str
     __offset: int
-    __lineNumber: Optional[int]
-    __line: Optional[str]
-    __lineOffset: Optional[int]
+    __lines: List[str]
+    __lineStarts: Sequence[int]
+    __lineIndex: Optional[int]
 
-    def __init__(self, source: str, offset: int):
+    def __init__(self, source: str, offset: int,
+                 lines: Optional[List[str]] = None, lineStarts: Optional[Sequence[int]] = None):
         """
         TokenMappingView constructor.
 
         :param source: Source of the processed text.
         :param offset: Offset at which the Token starts in the processed text.
+        :param lines: lines of the source, computed together with lineStarts if not provided.
+        :param lineStarts: sorted offsets at which the lines start in the source.
         """
-        self.__source = source
+        if lines is None or lineStarts is None:
+            lines, lineStarts = _splitLines(source)
+
         self.__offset = offset
-        self.__lineNumber = None
-        self.__line = None
-        self.__lineOffset = None
+        self.__lines = lines
+        self.__lineStarts = lineStarts
+        self.__lineIndex = None
+
+    def __getLineIndex(self):
+        if self.__lineIndex is None:
+            self.__lineIndex = bisect_right(self.__lineStarts, self.__offset) - 1
+
+        return self.__lineIndex
 
     @property
     def lineNumber(self):
         """Number of the line that contains the Token."""
-        if self.__lineNumber is None:
-            self.__lineNumber = self.__source.count("\n", 0, self.__offset) + 1
-
-        return self.__lineNumber
+        return self.__getLineIndex() + 1
 
     @property
     def line(self):
         """Line that contains the Token."""
-        if self.__line is None:
-            left = self.__source.rfind("\n", 0, self.__offset) + 1
-            right = self.__source.find("\n", self.__offset)
-
-            self.__line = self.__source[left : right]
-            self.__lineOffset = self.__offset - left
-
-        return self.__line
+        return self.__lines[self.__getLineIndex()]
 
     @property
     def lineOffset(self):
         """Offset where the Token starts in the line."""
-        if self.__lineOffset is None:
-            self.__lineOffset = self.__offset - self.__source.rfind("\n", 0, self.__offset) - 1
-
-        return self.__lineOffset
+        return self.__offset - self.__lineStarts[self.__getLineIndex()]
 
     @property
     def offset(self):
@@ -80,19 +174,27 @@ class TokenMappingView:
 class TokenizerResult:
     """Stores result created by a Tokenizer."""
     __source: Union[str, None]
-    __tokenMap: Dict[Token, int]
     __tokens: List[Token]
+    __offsets: array
+    __lines: Optional[List[str]]
+    __lineStarts: Optional[array]
+    __lastMapping: Tuple[Optional[int], Optional[TokenMappingView]]
 
-    def __init__(self, source: str):
+    def __init__(self, source: str, tokens: Optional[List[Token]] = None, offsets: Optional[array] = None):
         """
         TokenizerResult constructor.
 
         :param source: Text source of the Tokens.
+        :param tokens: already created Tokens, taken over by the result.
+        :param offsets: offsets of the already created Tokens, parallel to tokens.
         """
-        self.__tokenMap = {}
-        self.__tokens = []
+        self.__tokens = [] if tokens is None else tokens
+        self.__offsets = array("q") if offsets is None else offsets
         self.__sourceFilePath = None
         self.__source = source
+        self.__lines = None
+        self.__lineStarts = None
+        self.__lastMapping = (None, None)
 
     @property
     def source(self):
@@ -104,6 +206,11 @@ class TokenizerResult:
         """List of tokens created from processed text."""
         return self.__tokens
 
+    @property
+    def offsets(self):
+        """Offsets of the tokens in the processed text, parallel to tokens."""
+        return self.__offsets
+
     def addToken(self, token: Token, offset: int):
         """
         Add a token to the tokenizer result.
@@ -112,33 +219,73 @@ class TokenizerResult:
         :param offset: Offset at which the token was captured from in the processed text.
         """
         self.__tokens.append(token)
-        self.__tokenMap[token] = offset
+        self.__offsets.append(offset)
 
-    def getTokenMapping(self, token: Token):
+    def tokenIndex(self, token: Token) -> Optional[int]:
         """
-        Get a mapping for specified token.
+        Get the index of a token.
+
+        Marker tokens (e.g. EOL) are shared, for those the index of the first occurrence is returned.
 
         :param token: Token.
-        :return: Mapping for the provided Token.
+        :return: Index of the Token in tokens.
+        """
+        for index, storedToken in enumerate(self.__tokens):
+            if storedToken is token:
+                return index
+
+    def getTokenMapping(self, index: int):
+        """
+        Get a mapping for specified token.
+
+        :param index: index of the Token in tokens, use tokenIndex to get it for a Token.
+        :return: Mapping for the Token, None if the index is out of range.
+        :raises TypeError: if the index is not an int.
         """
+        if not isinstance(index, int):
+            raise TypeError(f"Token mapping index must be an int, not {type(index).__name__}, "
+                            f"use tokenIndex() to get the index of a Token")
+
         if self.__source is None:
             raise TokenizerError("Tried to get a Token mapping without text source!")
 
-        offset = self.__tokenMap.get(token, None)
+        if -len(self.__offsets) <= index < len(self.__offsets):
+            offset = self.__offsets[index]
+            lastOffset, mappingView = self.__lastMapping
+
+            if offset != lastOffset:
+                if self.__lines is None:
+                    self.__lines, self.__lineStarts = _splitLines(self.__source)
 
-        if offset is not None:
-            return TokenMappingView(self.source, offset)
+                mappingView = TokenMappingView(self.__source, offset, self.__lines, self.__lineStarts)
+                self.__lastMapping = (offset, mappingView)
+
+            return mappingView
 
 
 class Tokenizer:
     """Converts text into Tokens."""
     __tokenProcessors: List[TokenProcessor]
+    __processFunctions: List[Callable[[str, int], Optional[Sequence[Tuple[Optional[Token], int]]]]]
+    __combinedRegex: Optional[re.Pattern]
+    __builders: Dict[str, Tuple[Callable, int]]
+    __hotReorder: bool
+    __fixedProcessFunctions: Set[Callable]
+
+    reorderInterval = 1024
+    """Number of tokens between reordering the TokenProcessors when hotReorder is enabled."""
 
-    def __init__(self, tokenProcessors: Iterable[Union[type(TokenProcessor), TokenProcessor]]):
+    def __init__(self, tokenProcessors: Iterable[Union[type(TokenProcessor), TokenProcessor]],
+                 regexModule: ModuleType = re, hotReorder: bool = False):
         """
         Tokenizer Constructor.
 
         :param tokenProcessors: instances or classes of TokenProcessors.
+        :param regexModule: module with a re compatible interface (e.g. regex or re2) used to compile the combined
+                            regex, re is used if the module can't compile it.
+        :param hotReorder: periodically reorder the TokenProcessors that are not orderFixed by the number of tokens they
+                           created since the start of the tokenization, only applies when the TokenProcessors are tried
+                           one by one (some of them can't be combined), a RuntimeWarning is issued when it has no effect.
         """
         tokenProcessorInstances = []
         self.__tokenProcessors = tokenProcessorInstances
@@ -149,48 +296,122 @@ class Tokenizer:
 
             tokenProcessorInstances.append(tokenProcessor)
 
-    def tokenize(self, source: Union[str, TextIO]):
+        self.__processFunctions = [tokenProcessor.process for tokenProcessor in tokenProcessorInstances]
+        self.__hotReorder = hotReorder
+        self.__fixedProcessFunctions = set(tokenProcessor.process for tokenProcessor in tokenProcessorInstances
+                                           if tokenProcessor.orderFixed)
+
+        self.__combinedRegex = None
+        self.__builders = {}
+        combinedPattern = None
+
+        if all(_isCombinable(tokenProcessor) for tokenProcessor in tokenProcessorInstances):
+            patterns = []
+            group = 0
+
+            try:
+                for index, tokenProcessor in enumerate(tokenProcessorInstances):
+                    name = f"p{index}"
+                    group += 1
+
+                    patterns.append(f"(?P<{name}>{_shiftGroupReferences(tokenProcessor.buildPattern, group)})")
+                    self.__builders[name] = (tokenProcessor.build, group)
+
+                    group += re.compile(tokenProcessor.buildPattern).groups
+
+                combinedPattern = "|".join(patterns)
+            except ValueError:
+                # the group references can't be kept intact in the combined regex, use the per-processor loop
+                self.__builders = {}
+
+        if combinedPattern is not None:
+            try:
+                self.__combinedRegex = regexModule.compile(combinedPattern)
+            except regexModule.error:
+                try:
+                    self.__combinedRegex = re.compile(combinedPattern)
+                except re.error:
+                    # e.g. inline global flags or group names repeated across processors, use the per-processor loop
+                    self.__combinedRegex = None
+                    self.__builders = {}
+
+        if hotReorder and self.__combinedRegex is not None:
+            warnings.warn("hotReorder has no effect, the TokenProcessors are matched with a combined regex",
+                          RuntimeWarning, stacklevel=2)
+
+    def __reorderProcessFunctions(self, processFunctions: List[Callable], hits: Dict[Callable, int]) -> List[Callable]:
         """
-        Tokenize text content.
+        Sort the process functions between the order fixed ones by the number of created tokens.
 
-        :param source: source of the content to process.
-        :return: token result.
+        :param processFunctions: process functions in the current order.
+        :param hits: number of created tokens by the process functions.
+        :return: reordered process functions.
         """
-        tokenProcessors = self.__tokenProcessors
-        pos = 0
+        fixed = self.__fixedProcessFunctions
+        reordered = []
+        segment = []
 
-        if not isinstance(source, str):
-            source = source.read()
+        for process in processFunctions:
+            if process in fixed:
+                reordered.extend(sorted(segment, key=hits.__getitem__, reverse=True))
+                reordered.append(process)
+                segment = []
+            else:
+                segment.append(process)
+
+        reordered.extend(sorted(segment, key=hits.__getitem__, reverse=True))
+
+        return reordered
 
+    def __iterate(self, source: str) -> Iterator[Tuple[Token, int]]:
+        """
+        Tokenize text content lazily.
+
+        :param source: text content to process.
+        :return: generator of the created Tokens and their offsets.
+        """
         sourceLength = len(source)
-        result = TokenizerResult(source)
 
-        processed = True
-        while processed:
-            processed = False
-            for tokenProcessor in tokenProcessors:
-                res = tokenProcessor.process(source, pos)
+        if self.__combinedRegex is not None:
+            pos = yield from _scanCombined(source, self.__combinedRegex, self.__builders)
+
+        else:
+            pos = 0
+            processFunctions = self.__processFunctions
+            hotReorder = self.__hotReorder
+            hits = dict.fromkeys(processFunctions, 0)
+            untilReorder = self.reorderInterval
+            processed = True
+            while processed:
+                processed = False
+                for process in processFunctions:
+                    res = process(source, pos)
+
+                    if res is not None:
+                        for token, consumed in res:
+                            if token is not None:
+                                yield token, pos
 
-                if res is not None:
-                    if not isinstance(res, Generator) and not isinstance(res[0], Iterable):
-                        res = (res,)
+                            pos += consumed
 
-                    for token, consumed in res:
-                        if token is not None:
-                            result.addToken(token, pos)
+                            processed = True
 
-                        pos += consumed
+                        if processed:
+                            if hotReorder:
+                                hits[process] += 1
+                                untilReorder -= 1
 
-                        processed = True
+                                if untilReorder == 0:
+                                    processFunctions = self.__reorderProcessFunctions(processFunctions, hits)
+                                    untilReorder = self.reorderInterval
 
-                    if processed:
-                        break
+                            break
 
         if pos != sourceLength:
             mappingView = TokenMappingView(source, pos)
             raise TokenizerError(f"Unable to tokenize:\n{mappingView.makePointer()}")
 
-        for tokenProcessor in tokenProcessors:
+        for tokenProcessor in self.__tokenProcessors:
             res = tokenProcessor.finalizer()
 
             if not isinstance(res, Generator):
@@ -198,8 +419,40 @@ class Tokenizer:
 
             for token in res:
                 if token is not None:
-                    result.addToken(token, sourceLength)
+                    yield token, sourceLength
+
+        yield EOF, sourceLength
+
+    def itokens(self, source: Union[str, TextIO]) -> Iterator[Tuple[Token, int]]:
+        """
+        Tokenize text content lazily, without storing the Tokens.
+
+        :param source: source of the content to process.
+        :return: generator of the created Tokens and their offsets, TokenizerError is raised when iteration reaches
+                 content that can't be tokenized.
+        """
+        if not isinstance(source, str):
+            source = source.read()
+
+        return self.__iterate(source)
+
+    def tokenize(self, source: Union[str, TextIO]):
+        """
+        Tokenize text content.
+
+        :param source: source of the content to process.
+        :return: token result.
+        """
+        if not isinstance(source, str):
+            source = source.read()
+
+        tokens = []
+        offsets = array("q")
+        appendToken = tokens.append
+        appendOffset = offsets.append
 
-        result.addToken(EndOfFileToken(), sourceLength)
+        for token, offset in self.__iterate(source):
+            appendToken(token)
+            appendOffset(offset)
 
-        return result
+        return TokenizerResult(source, tokens, offsets)
@@ -1,23 +1,48 @@
 import abc
 import re
+import sys
 from copy import copy
-from typing import Dict, Callable, Tuple, Any, Optional
+from typing import Dict, Callable, Tuple, Any, Optional, Sequence, List
 
 from .tokens import *
 from .tokenizerexceptions import TokenizerError
 
 
+_reCharacterSetSyntax = re.compile(r"[\\\[\]^-]")
+_reLiteral = re.compile(r"(?:[^\\.^$*+?{}\[\]|()]|\\[^A-Za-z0-9])+")
+_reEscapedCharacter = re.compile(r"\\(.)")
+
+
 class TokenProcessor:
     """Base TokenProcessor class."""
 
+    buildPattern: Optional[str] = None
+    """Regular expression matching the processed text, its matches are passed to build. The Tokenizer combines the
+    buildPatterns into one regex when every TokenProcessor has one, implements build and doesn't override process
+    below the class that implements build."""
+
+    orderFixed: bool = True
+    """Keeps the position of the TokenProcessor when the Tokenizer reorders them, unset it only for processors whose
+    matches never overlap with the matches of the other reordered processors."""
+
     @abc.abstractmethod
-    def process(self, content: str, offset: int) -> Optional[Tuple[Optional[Token], int]]:
+    def process(self, content: str, offset: int) -> Optional[Sequence[Tuple[Optional[Token], int]]]:
         """
-        Processes text content into a token.
+        Processes text content into tokens.
 
         :param content: processed text content.
         :param offset: current offset in the text content.
-        :return: tuple with a Token and a number of consumed characters.
+        :return: sequence of tuples with a Token and a number of consumed characters.
+        """
+        raise NotImplementedError
+
+    def build(self, match: re.Match, group: int) -> Optional[Sequence[Tuple[Optional[Token], int]]]:
+        """
+        Creates tokens from a match of the buildPattern.
+
+        :param match: match of the buildPattern.
+        :param group: index of the group enclosing the buildPattern, groups of the buildPattern start at group + 1.
+        :return: sequence of tuples with a Token and a number of consumed characters.
         """
         raise NotImplementedError
 
@@ -39,13 +64,19 @@ class TokenProcessor:
 class NewLineProcessor(TokenProcessor):
     """Processes new line characters into EndOfLineToken."""
 
-    __reNewLine = re.compile(r"\r?\n")
+    buildPattern = r"\r?\n"
 
     def process(self, content: str, offset: int):
-        match = NewLineProcessor.__reNewLine.match(content, pos=offset)
+        character = content[offset : offset + 1]
+
+        if character == "\n":
+            return ((EOL, 1),)
+
+        if character == "\r" and content.startswith("\n", offset + 1):
+            return ((EOL, 2),)
 
-        if match:
-            return EndOfLineToken(), match.end() - offset
+    def build(self, match: re.Match, group: int):
+        return ((EOL, match.end() - match.start()),)
 
 
 class ClassicScopeProcessor(TokenProcessor):
@@ -59,21 +90,28 @@ class ClassicScopeProcessor(TokenProcessor):
         :param endCharacter: character that will end the scope.
         """
         # noinspection RegExpDuplicateAlternationBranch
-        self.__regex = re.compile(rf"({re.escape(startCharacter)})|({re.escape(endCharacter)})")
+        self.buildPattern = rf"({re.escape(startCharacter)})|({re.escape(endCharacter)})"
+        self.__startCharacter = startCharacter
+        self.__endCharacter = endCharacter
 
     def process(self, content: str, offset: int):
-        match = self.__regex.match(content, pos=offset)
+        if content.startswith(self.__startCharacter, offset):
+            return ((SCOPE_START, len(self.__startCharacter)),)
 
-        if match is not None:
-            token = ScopeStartToken() if match.lastindex == 1 else ScopeEndToken()
+        if content.startswith(self.__endCharacter, offset):
+            return ((SCOPE_END, len(self.__endCharacter)),)
+
+    def build(self, match: re.Match, group: int):
+        token = SCOPE_START if match[group + 1] is not None else SCOPE_END
 
-            return token, match.end() - offset
+        return ((token, match.end() - match.start()),)
 
 
 class IndentScopeProcessor(TokenProcessor):
     """Processes indent based scopes into ScopeStartToken and ScopeEndToken."""
 
-    reScope = re.compile(r"\n(\t+)|\n( +)|\n([^\t ])")
+    reScope = re.compile(r"(?<=\n)(?:(\t+)|( +)|(?=[^\t ]))")
+    buildPattern = reScope.pattern
     __allowMixed: bool
     __level: int
     __mode: Optional[int]
@@ -91,47 +129,84 @@ class IndentScopeProcessor(TokenProcessor):
         self.__divider: int = 0
 
     def process(self, content: str, offset: int):
-        res = IndentScopeProcessor.reScope.match(content, pos=offset - 1)
+        length = len(content)
+
+        if offset == 0 or offset >= length or content[offset - 1] != "\n":
+            return None
 
-        if res is not None:
-            newLevel = res.end() - offset
+        character = content[offset]
 
-            if res.lastindex == 3:
-                newLevel = 0
+        if character == "\t":
+            mode = 1
+        elif character == " ":
+            mode = 2
+        else:
+            return self.__changeLevel(0, None)
 
-            elif self.__mode is None:
-                self.__mode = res.lastindex
+        end = offset + 1
+
+        while end < length and content[end] == character:
+            end += 1
+
+        return self.__changeLevel(end - offset, mode)
+
+    def build(self, match: re.Match, group: int):
+        newLevel = match.end() - match.start()
+
+        if newLevel == 0:
+            return self.__changeLevel(0, None)
+
+        return self.__changeLevel(newLevel, 1 if match[group + 1] is not None else 2)
+
+    def __changeLevel(self, newLevel: int, mode: Optional[int]):
+        """
+        Update the indent level and create the scope tokens.
+
+        :param newLevel: indent length of the new line.
+        :param mode: 1 for tab indent, 2 for space indent, None without indent.
+        :return: list of tuples with a Token and a number of consumed characters.
+        """
+        result = []
+
+        if newLevel != 0:
+            if self.__mode is None:
+                self.__mode = mode
                 self.__divider = newLevel
 
-            elif self.__mode != res.lastindex:
+            elif self.__mode != mode:
                 raise TokenizerError("mixed indent")
 
-            if newLevel != self.__level:
-                difference = abs(self.__level - newLevel)
+        if newLevel != self.__level:
+            difference = abs(self.__level - newLevel)
+
+            if difference % self.__divider != 0:
+                raise TokenizerError(f"invalid indent multiply, should be {self.__divider}")
 
-                if difference % self.__divider != 0:
-                    raise TokenizerError(f"invalid indent multiply, should be {self.__divider}")
+            if newLevel > self.__level:
+                token = SCOPE_START
+            else:
+                token = SCOPE_END
 
-                if newLevel > self.__level:
-                    token = ScopeStartToken()
-                else:
-                    token = ScopeEndToken()
+            consumed = newLevel
 
-                for i in range(difference // self.__divider):
-                    yield token, newLevel
+            for i in range(difference // self.__divider):
+                result.append((token, consumed))
+                consumed = 0
 
-                self.__level = newLevel
+            self.__level = newLevel
 
-            elif newLevel != 0:
-                if self.__allowMixed:
-                    self.__mode = None
+        elif newLevel != 0:
+            if self.__allowMixed:
+                self.__mode = None
 
-                yield None, newLevel
+            result.append((None, newLevel))
+
+        return result
 
     def finalizer(self) -> Optional[Token]:
         if self.__level > 0:
             for i in range(self.__level):
-                yield ScopeEndToken()
+                yield SCOPE_END
 
 
 class CommentProcessor(TokenProcessor):
@@ -143,13 +218,17 @@ class CommentProcessor(TokenProcessor):
 
         :param commentCharacter: character that will mark the rest of the line as a comment.
         """
-        self.__regex = re.compile(rf"{commentCharacter}(.+)")
+        self.buildPattern = rf"{commentCharacter}(.+)"
+        self.__match = re.compile(self.buildPattern).match
 
     def process(self, content: str, offset: int):
-        match = self.__regex.match(content, pos=offset)
+        match = self.__match(content, offset)
 
         if match is not None:
-            return CommentToken(text=match[1]), match.end() - offset
+            return self.build(match, 0)
+
+    def build(self, match: re.Match, group: int):
+        return ((CommentToken(text=match[group + 1]), match.end() - match.start()),)
 
 
 class ConsumingProcessor(TokenProcessor):
@@ -161,19 +240,45 @@ class ConsumingProcessor(TokenProcessor):
 
         :param toConsume: set of characters that this instance will consume.
         """
-        self.__regex = re.compile(rf"[{toConsume}]+")
+        self.buildPattern = rf"[{toConsume}]+"
+        self.__regex = re.compile(self.buildPattern)
+        self.__match = self.__regex.match
+        self.__characters = None if _reCharacterSetSyntax.search(toConsume) else frozenset(toConsume)
 
     def process(self, content: str, offset: int):
-        match = self.__regex.match(content, pos=offset)
+        characters = self.__characters
 
-        if match is not None:
-            return None, match.end() - offset
+        if characters is None:
+            match = self.__match(content, offset)
+
+            if match is not None:
+                return self.build(match, 0)
+
+            return None
+
+        end = offset
+        length = len(content)
+
+        while end < length and content[end] in characters:
+            end += 1
+
+        if end != offset:
+            return ((None, end - offset),)
+
+    def build(self, match: re.Match, group: int):
+        return ((None, match.end() - match.start()),)
 
     def __or__(self, other: "ConsumingProcessor"):
         newObj = copy(self)
 
-        newRegex = f"{self.__regex.pattern}|{other.__regex.pattern}"
-        newObj.__regex = re.compile(newRegex, self.__regex.flags)
+        newObj.buildPattern = f"{self.buildPattern}|{other.buildPattern}"
+        newObj.__regex = re.compile(newObj.buildPattern, self.__regex.flags)
+        newObj.__match = newObj.__regex.match
+
+        if self.__characters is None or other.__characters is None:
+            newObj.__characters = None
+        else:
+            newObj.__characters = self.__characters | other.__characters
 
         return newObj
 
@@ -200,25 +305,32 @@ class ValueProcessor(TokenProcessor):
 
             regexBuild.append(expression)
 
-        self.__regex = re.compile(rf"{'|'.join(regexBuild)}")
+        self.buildPattern = rf"{'|'.join(regexBuild)}"
+        self.__regex = re.compile(self.buildPattern)
+        self.__match = self.__regex.match
 
     def process(self, content: str, offset: int):
-        match = self.__regex.match(content, pos=offset)
+        match = self.__match(content, offset)
 
         if match is not None:
-            index = match.lastindex
-            tp = self.__types[index - 1]
+            return self.build(match, 0)
 
-            if (constructor := self.__constructors.get(tp, None)) is None:
-                constructor = tp
+    def build(self, match: re.Match, group: int):
+        for index, tp in enumerate(self.__types, group + 1):
+            if (value := match[index]) is not None:
+                break
 
-            return ValueToken(type=tp, value=constructor(match[index])), match.end() - offset
+        if (constructor := self.__constructors.get(tp, None)) is None:
+            constructor = tp
+
+        return ((ValueToken(type=tp, _value=value, _constructor=constructor), match.end() - match.start()),)
 
     def __or__(self, other: "ValueProcessor"):
         newObj = copy(self)
 
-        newRegex = f"{self.__regex.pattern}|{other.__regex.pattern}"
-        newObj.__regex = re.compile(newRegex, self.__regex.flags)
+        newObj.buildPattern = f"{self.buildPattern}|{other.buildPattern}"
+        newObj.__regex = re.compile(newObj.buildPattern, self.__regex.flags)
+        newObj.__match = newObj.__regex.match
 
         newObj.__types.extend(other.__types)
         newObj.__constructors.update(other.__constructors)
@@ -240,19 +352,80 @@ class SequenceProcessor(TokenProcessor):
 
         :param sequences: string sequences to match
         """
-        self.__regex = re.compile(rf"{'|'.join(sequences)}")
+        self.buildPattern = rf"{'|'.join(sequences)}"
+        self.__regex = re.compile(self.buildPattern)
+        self.__match = self.__regex.match
+
+        if all(_reLiteral.fullmatch(sequence) for sequence in sequences):
+            self.__setLiterals([_reEscapedCharacter.sub(r"\1", sequence) for sequence in sequences])
+        else:
+            self.__setLiterals(None)
+
+    def __setLiterals(self, literals: Optional[List[str]]):
+        """
+        Set the literal sequences matched without the regex.
+
+        :param literals: unescaped sequences in the order of the alternation, None if any of them is not a literal.
+        """
+        if literals is None:
+            self.__literals = None
+            self.__literalIndexes = None
+            self.__literalLengths = None
+            return
+
+        literals = [sys.intern(literal) for literal in literals]
+        self.__literals = literals
+        literalIndexes = {}
+
+        for index, literal in enumerate(literals):
+            literalIndexes.setdefault(literal, index)
+
+        self.__literalIndexes = literalIndexes
+        self.__literalLengths = sorted(set(len(literal) for literal in literals))
 
     def process(self, content: str, offset: int):
-        match = self.__regex.match(content, pos=offset)
+        literalIndexes = self.__literalIndexes
 
-        if match is not None:
-            return SequenceToken(sequence=match[0]), match.end() - offset
+        if literalIndexes is None:
+            match = self.__match(content, offset)
+
+            if match is not None:
+                return self.build(match, 0)
+
+            return None
+
+        foundIndex = None
+
+        for length in self.__literalLengths:
+            index = literalIndexes.get(content[offset : offset + length], None)
+
+            if index is not None and (foundIndex is None or index < foundIndex):
+                foundIndex = index
+
+        if foundIndex is not None:
+            found = self.__literals[foundIndex]
+
+            return ((SequenceToken(sequence=found), len(found)),)
+
+    def build(self, match: re.Match, group: int):
+        sequence = match[group]
+
+        if self.__literalIndexes is not None:
+            sequence = self.__literals[self.__literalIndexes[sequence]]
+
+        return ((SequenceToken(sequence=sequence), match.end() - match.start()),)
 
     def __or__(self, other: "SequenceProcessor"):
         newObj = copy(self)
 
-        newRegex = f"{self.__regex.pattern}|{other.__regex.pattern}"
-        newObj.__regex = re.compile(newRegex, self.__regex.flags)
+        newObj.buildPattern = f"{self.buildPattern}|{other.buildPattern}"
+        newObj.__regex = re.compile(newObj.buildPattern, self.__regex.flags)
+        newObj.__match = newObj.__regex.match
+
+        if self.__literals is None or other.__literals is None:
+            newObj.__setLiterals(None)
+        else:
+            newObj.__setLiterals(self.__literals + other.__literals)
 
         return newObj
 
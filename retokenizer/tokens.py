@@ -1,4 +1,6 @@
 class TokenMetaClass(type):
+    __kindCount = 0
+
     @classmethod
     def __prepare__(metaCls, name, bases):
         cls = super().__prepare__(metaCls, name, bases)
@@ -6,12 +8,21 @@ class TokenMetaClass(type):
 
         return cls
 
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+
+        cls.kind = TokenMetaClass.__kindCount
+        TokenMetaClass.__kindCount += 1
+
     def __contains__(self, item: "Token") -> bool:
         return self is type(item)
 
 
 class Token(metaclass=TokenMetaClass):
     """Base Token class."""
+    kind: int
+    """Integer unique to every Token class."""
+
     def __init__(self, **kwargs):
         for key, value in kwargs.items():
             setattr(self, key, value)
@@ -51,11 +62,55 @@ class CommentToken(Token):
 class ValueToken(Token):
     """Contains a type and a converted value."""
 
-    __slots__ = ("type", "value")
+    __slots__ = ("type", "_value", "_constructor")
     type: type
 
+    @property
+    def value(self):
+        """Value converted from the raw text on first access."""
+        try:
+            value = self._value
+        except AttributeError:
+            raise AttributeError("value") from None
+
+        if (constructor := getattr(self, "_constructor", None)) is not None:
+            value = self._value = constructor(value)
+            self._constructor = None
+
+        return value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        self._constructor = None
+
+    def __getstate__(self):
+        return {"type": getattr(self, "type", None), "value": getattr(self, "value", None)}
+
+    def __setstate__(self, state):
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    @property
+    def args(self):
+        return {"type": getattr(self, "type", None), "value": getattr(self, "value", None)}
+
 
 class SequenceToken(Token):
     """Contains a text sequence."""
     __slots__ = ("sequence",)
     sequence: str
+
+
+KIND_EOL = EndOfLineToken.kind
+KIND_EOF = EndOfFileToken.kind
+KIND_SCOPE_START = ScopeStartToken.kind
+KIND_SCOPE_END = ScopeEndToken.kind
+KIND_COMMENT = CommentToken.kind
+KIND_VALUE = ValueToken.kind
+KIND_SEQUENCE = SequenceToken.kind
+
+EOL = EndOfLineToken()
+EOF = EndOfFileToken()
+SCOPE_START = ScopeStartToken()
+SCOPE_END = ScopeEndToken()
@@ -0,0 +1,239 @@
+import itertools
+import re
+import unittest
+import warnings
+
+from retokenizer import *
+
+
+class LoopOnlyProcessor(TokenProcessor):
+    """Has no buildPattern, forces the Tokenizer to try the TokenProcessors one by one."""
+
+    def process(self, content: str, offset: int):
+        return None
+
+
+def makeProcessors():
+    return [NewLineProcessor, IndentScopeProcessor(), CommentProcessor(), ConsumingProcessor(" \t"),
+            NumberProcessor | QuotedStringProcessor | BooleanProcessor, ClassicScopeProcessor("{", "}"),
+            OperatorProcessor | SequenceProcessor(r"[a-zA-Z_]\w*", r"\(", r"\)", ",", ":")]
+
+
+def tokenize(processors, source, loop=False):
+    if loop:
+        processors = processors + [LoopOnlyProcessor()]
+
+    result = Tokenizer(processors).tokenize(source)
+
+    return [(repr(token), offset) for token, offset in zip(result.tokens, result.offsets)]
+
+
+class TokenizerPathsTest(unittest.TestCase):
+    """The combined regex must tokenize the same way as the per-processor loop."""
+
+    sources = [
+        "a = 1\nb = 2.5 # c\n",
+        "def f(x):\n\tif x:\n\t\treturn 'a'\n\treturn \"b\"\nx = f(True)\n",
+        "x {\n  y += 3\n  z -= -4 // 2\n}\n",
+        "if a:\n    b\n        c\n    d\ne\n",
+        "a\r\n\tb\r\nc {}\r\n",
+    ]
+
+    def assertSamePaths(self, makeProcessors, source):
+        self.assertEqual(tokenize(makeProcessors(), source), tokenize(makeProcessors(), source, loop=True))
+
+    def testSources(self):
+        for source in self.sources:
+            with self.subTest(source=source):
+                self.assertSamePaths(makeProcessors, source)
+
+    def testBackReferenceAbove99(self):
+        def processors():
+            values = [ValueProcessor(*((rf"x{i}_{j}", str) for j in range(10))) for i in range(10)]
+
+            return values + [ConsumingProcessor(" "), OperatorProcessor]
+
+        self.assertSamePaths(processors, "++ --")
+        self.assertEqual([token for token, offset in tokenize(processors(), "++ --")][:2],
+                         ["SequenceToken(sequence='++')", "SequenceToken(sequence='--')"])
+
+    def testConditionalGroup(self):
+        self.assertSamePaths(lambda: [ConsumingProcessor(" "), SequenceProcessor(r"(<)?x(?(1)>)")], "<x> x")
+
+    def testUncombinablePatterns(self):
+        self.assertSamePaths(lambda: [ConsumingProcessor(" "), SequenceProcessor("(?i)select")], "SELECT select")
+        self.assertSamePaths(lambda: [ConsumingProcessor(" "), SequenceProcessor("(?P<x>a)"),
+                                      SequenceProcessor("(?P<x>b)")], "a b")
+
+    def testCharacterSetEscape(self):
+        self.assertSamePaths(lambda: [SequenceProcessor(r"(a)[\1]")], "a\x01")
+
+    def testOverriddenProcess(self):
+        class UpperProcessor(SequenceProcessor):
+            def process(self, content: str, offset: int):
+                res = super().process(content, offset)
+
+                if res is not None:
+                    return [(SequenceToken(sequence=token.sequence.upper()), consumed) for token, consumed in res]
+
+        result = Tokenizer([UpperProcessor("ab")]).tokenize("ab")
+
+        self.assertEqual(result.tokens[0].sequence, "AB")
+
+    def testProcessOnly(self):
+        class PatternProcessor(TokenProcessor):
+            def __init__(self, pattern):
+                self.pattern = pattern
+
+            def process(self, content: str, offset: int):
+                if content.startswith("ab", offset):
+                    return ((SequenceToken(sequence="ab"), 2),)
+
+        class BuildPatternProcessor(PatternProcessor):
+            buildPattern = "ab"
+
+        for processor in (PatternProcessor(re.compile("ab")), PatternProcessor("ab"), BuildPatternProcessor("ab")):
+            with self.subTest(processor=processor):
+                result = Tokenizer([processor]).tokenize("abab")
+
+                self.assertEqual([repr(token) for token in result.tokens],
+                                 ["SequenceToken(sequence='ab')", "SequenceToken(sequence='ab')", "EndOfFileToken()"])
+
+    def testSharedLiterals(self):
+        for loop in (False, True):
+            with self.subTest(loop=loop):
+                processors = [ConsumingProcessor(" "), SequenceProcessor("while", "if")]
+                tokens = Tokenizer(processors + ([LoopOnlyProcessor()] if loop else [])).tokenize("if while if").tokens
+
+                self.assertIs(tokens[0].sequence, tokens[2].sequence)
+
+
+class CountingProcessor(SequenceProcessor):
+    """Counts the calls of process."""
+
+    def __init__(self, *sequences: str):
+        super().__init__(*sequences)
+        self.calls = 0
+        self.orderFixed = False
+
+    def process(self, content: str, offset: int):
+        self.calls += 1
+
+        return super().process(content, offset)
+
+
+class HotReorderTest(unittest.TestCase):
+    def makeTokenizer(self, *processors):
+        tokenizer = Tokenizer([ConsumingProcessor(" "), *processors, LoopOnlyProcessor()], hotReorder=True)
+        tokenizer.reorderInterval = 4
+
+        return tokenizer
+
+    def testReorders(self):
+        a = CountingProcessor("a")
+        b = CountingProcessor("b")
+        source = "a " + "b " * 100
+        expected = tokenize([ConsumingProcessor(" "), SequenceProcessor("a"), SequenceProcessor("b")], source)
+
+        result = self.makeTokenizer(a, b).tokenize(source)
+
+        self.assertEqual([(repr(token), offset) for token, offset in zip(result.tokens, result.offsets)], expected)
+        self.assertLess(a.calls, 20)
+
+    def testKeepsOverlappingProcessors(self):
+        tokenizer = self.makeTokenizer(NumberProcessor, OperatorProcessor, SequenceProcessor("x"))
+        expected = [repr(token) for token in tokenizer.tokenize("-3").tokens]
+
+        tokenizer.tokenize("x - " * 1500)
+
+        self.assertEqual([repr(token) for token in tokenizer.tokenize("-3").tokens], expected)
+        self.assertEqual(expected[0], "ValueToken(type=<class 'int'>, value=-3)")
+
+    def testStartsEveryTokenizationInOrder(self):
+        a = CountingProcessor("a")
+        b = CountingProcessor("b")
+        tokenizer = self.makeTokenizer(a, b)
+
+        tokenizer.tokenize("b " * 100)
+        a.calls = b.calls = 0
+        tokenizer.tokenize("a")
+
+        # a is tried first again, it matches and both are tried once more at the end of the content
+        self.assertEqual((a.calls, b.calls), (2, 1))
+
+    def testWarnsWithCombinedRegex(self):
+        with self.assertWarns(RuntimeWarning):
+            Tokenizer(makeProcessors(), hotReorder=True)
+
+    def testNoWarningWithLoop(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            Tokenizer(makeProcessors() + [LoopOnlyProcessor()], hotReorder=True)
+
+
+class TokenizerResultTest(unittest.TestCase):
+    def setUp(self):
+        self.result = Tokenizer(makeProcessors()).tokenize("a = 1\n\tb\n")
+
+    def testOffsets(self):
+        self.assertEqual(list(self.result.offsets), [0, 2, 4, 5, 6, 7, 8, 9, 9])
+        self.assertEqual(len(self.result.offsets), len(self.result.tokens))
+
+    def testGetTokenMapping(self):
+        mapping = self.result.getTokenMapping(5)
+
+        self.assertEqual(repr(self.result.tokens[5]), "SequenceToken(sequence='b')")
+        self.assertEqual((mapping.offset, mapping.lineNumber, mapping.lineOffset, mapping.line), (7, 2, 1, "\tb"))
+        self.assertEqual(mapping.makePointer(), "2:1:     b\n         ^")
+
+    def testNegativeIndex(self):
+        self.assertEqual(self.result.getTokenMapping(-1).offset, 9)
+        self.assertEqual(self.result.getTokenMapping(-9).offset, 0)
+
+    def testOutOfRange(self):
+        self.assertIsNone(self.result.getTokenMapping(9))
+        self.assertIsNone(self.result.getTokenMapping(-10))
+
+    def testToken(self):
+        token = self.result.tokens[0]
+
+        with self.assertRaisesRegex(TypeError, "tokenIndex"):
+            self.result.getTokenMapping(token)
+
+        self.assertEqual(self.result.getTokenMapping(self.result.tokenIndex(token)).offset, 0)
+
+    def testSharedMarkerTokens(self):
+        self.assertEqual(self.result.tokenIndex(EOL), 3)
+        self.assertEqual(self.result.tokenIndex(SCOPE_START), 4)
+        self.assertEqual(self.result.tokenIndex(SCOPE_END), 7)
+        self.assertEqual(self.result.tokenIndex(EOF), 8)
+        self.assertIsNone(self.result.tokenIndex(SequenceToken(sequence="a")))
+
+
+class ITokensTest(unittest.TestCase):
+    def testSameAsTokenize(self):
+        for loop in (False, True):
+            for source in TokenizerPathsTest.sources:
+                with self.subTest(source=source, loop=loop):
+                    expected = tokenize(makeProcessors(), source, loop)
+                    processors = makeProcessors() + ([LoopOnlyProcessor()] if loop else [])
+                    pairs = [(repr(token), offset) for token, offset in Tokenizer(processors).itokens(source)]
+
+                    self.assertEqual(pairs, expected)
+
+    def testLazyError(self):
+        for loop in (False, True):
+            with self.subTest(loop=loop):
+                processors = makeProcessors() + ([LoopOnlyProcessor()] if loop else [])
+                iterator = Tokenizer(processors).itokens("a = 1\nb = $\n")
+
+                self.assertEqual([repr(token) for token, offset in itertools.islice(iterator, 4)],
+                                 ["SequenceToken(sequence='a')", "SequenceToken(sequence='=')",
+                                  "ValueToken(type=<class 'int'>, value=1)", "EndOfLineToken()"])
+
+                with self.assertRaises(TokenizerError):
+                    list(iterator)
+
+
+if __name__ == "__main__":
+    unittest.main()
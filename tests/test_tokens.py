@@ -0,0 +1,53 @@
+import pickle
+import unittest
+
+from retokenizer import *
+
+
+class ValueTokenTest(unittest.TestCase):
+    def testLazyConversion(self):
+        calls = []
+
+        def constructor(text):
+            calls.append(text)
+
+            return int(text) * 2
+
+        token = ValueToken(type=int, _value="21", _constructor=constructor)
+
+        self.assertEqual(calls, [])
+        self.assertEqual(token.value, 42)
+        self.assertEqual(token.value, 42)
+        self.assertEqual(calls, ["21"])
+
+    def testSetter(self):
+        token = ValueToken(type=int, _value="1", _constructor=int)
+        token.value = "2"
+
+        self.assertEqual(token.value, "2")
+        self.assertEqual(ValueToken(type=float, value=1.5).value, 1.5)
+
+    def testMissingValue(self):
+        token = ValueToken(type=int)
+
+        with self.assertRaisesRegex(AttributeError, "^value$"):
+            token.value
+
+        self.assertEqual(repr(token), "ValueToken(type=<class 'int'>, value=None)")
+
+    def testPickle(self):
+        source = "True 'a' 1 2.5"
+        processors = [ConsumingProcessor(" "), NumberProcessor | QuotedStringProcessor | BooleanProcessor]
+        tokens = Tokenizer(processors).tokenize(source).tokens[:-1]
+        tokens.append(ValueToken(type=int, _value="7", _constructor=lambda text: int(text) + 1))
+
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            with self.subTest(protocol=protocol):
+                loaded = pickle.loads(pickle.dumps(tokens, protocol))
+
+                self.assertEqual([(token.type, token.value) for token in loaded],
+                                 [(bool, True), (str, "a"), (int, 1), (float, 2.5), (int, 8)])
+
+
+if __name__ == "__main__":
+    unittest.main()